@@ -65,6 +65,7 @@ a = Analysis(
         'psutil._psutil_windows',
         'psutil._pswindows',
         'tabulate',
+        'msgpack',
         # Windows specific
         'win32api',
         'win32con',
@@ -0,0 +1,56 @@
+"""Tests for the neighbors table serialization"""
+import unittest
+from datetime import datetime
+
+from winlldp.neighbor_store import encode_neighbors, decode_neighbors
+
+
+class TestNeighborStore(unittest.TestCase):
+    """Test encoding and decoding of the neighbors table"""
+
+    def setUp(self):
+        """Build a sample neighbor table"""
+        self.neighbors = {
+            'eth0:aa:bb:cc:dd:ee:ff:switch1': {
+                'interface': 'eth0',
+                'source_mac': 'aa:bb:cc:dd:ee:ff',
+                'data': {'chassis_id': 'switch1', 'system_name': 'core-sw', 'ttl': 120},
+                'first_seen': datetime(2024, 5, 1, 10, 0, 0, 123456).timestamp(),
+                'last_seen': datetime(2024, 5, 1, 10, 5, 30, 654321).timestamp(),
+                'ttl': 120
+            }
+        }
+
+    def test_round_trip(self):
+        """Test that a table survives encode/decode unchanged"""
+        payload = encode_neighbors(self.neighbors)
+        self.assertIsInstance(payload, bytes)
+        self.assertEqual(decode_neighbors(payload), self.neighbors)
+
+    def test_decode_legacy_json(self):
+        """Test that JSON files with ISO timestamps are still readable"""
+        payload = (
+            b'{"eth0:aa:bb:cc:dd:ee:ff:switch1": {"interface": "eth0", '
+            b'"source_mac": "aa:bb:cc:dd:ee:ff", '
+            b'"data": {"chassis_id": "switch1", "system_name": "core-sw", "ttl": 120}, '
+            b'"first_seen": "2024-05-01T10:00:00.123456", '
+            b'"last_seen": "2024-05-01T10:05:30.654321", "ttl": 120}}'
+        )
+        self.assertEqual(decode_neighbors(payload), self.neighbors)
+
+    def test_decode_empty_table(self):
+        """Test that empty tables decode, including legacy '{}' files"""
+        self.assertEqual(decode_neighbors(b'{}'), {})
+        self.assertEqual(decode_neighbors(encode_neighbors({})), {})
+
+    def test_decode_corrupt_payload(self):
+        """Test that truncated payloads raise ValueError"""
+        payload = encode_neighbors(self.neighbors)
+        with self.assertRaises(ValueError):
+            decode_neighbors(payload[:len(payload) // 2])
+        with self.assertRaises(ValueError):
+            decode_neighbors(b'')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -90,6 +90,15 @@ class TestPathResolution(unittest.TestCase):
             
             # Should use custom path when absolute
             self.assertEqual(config.neighbors_file, custom_path)
+    
+    def test_config_get_is_shared(self):
+        """Test that Config.get returns one instance per env file"""
+        from winlldp.config import Config
+        
+        with patch.dict(Config._instances, clear=True):
+            config = Config.get()
+            self.assertIs(Config.get(), config)
+            self.assertIsNot(Config(), config)
 
 
 if __name__ == '__main__':
@@ -4,26 +4,41 @@ LLDP capture subprocess module
 This module runs as a separate process to capture LLDP packets
 """
 import sys
-import json
 import os
+import threading
+import time
 import traceback
 from datetime import datetime
 
-def main():
+# How often (seconds) the in-memory neighbor table is written to disk
+FLUSH_INTERVAL = 1.0
+
+# Attempts (FLUSH_INTERVAL / 4 apart) at the final flush when the file is
+# in use; on Windows os.replace fails while a reader has it open
+EXIT_FLUSH_ATTEMPTS = 8
+
+def main(argv=None):
     # Get arguments
-    if len(sys.argv) < 4:
+    if argv is None:
+        argv = sys.argv[1:]
+    if len(argv) < 3:
         print("Usage: capture_subprocess.py <log_file> <neighbors_file> <pid_file>", file=sys.stderr)
         sys.exit(1)
     
-    log_file = sys.argv[1]
-    neighbors_file = sys.argv[2] 
-    pid_file = sys.argv[3]
+    log_file, neighbors_file, pid_file = argv[:3]
+    
+    # Keep the log open (line buffered) so logging a received packet does
+    # not reopen the file every time
+    log_handle = None
+    # Defined once the capture is set up; used by the final flush
+    flush_neighbors = None
     
     def log(msg):
+        nonlocal log_handle
         try:
-            with open(log_file, 'a') as f:
-                f.write(f"[{datetime.now().isoformat()}] {msg}\n")
-                f.flush()
+            if log_handle is None:
+                log_handle = open(log_file, 'a', buffering=1)
+            log_handle.write(f"[{datetime.now().isoformat()}] {msg}\n")
         except:
             pass
     
@@ -50,61 +65,146 @@ def main():
         
         # Import required modules
         log("Importing modules...")
-        from scapy.all import sniff, Ether
+        from scapy.all import sniff
         from winlldp.lldp_packet import LLDPPacket
         from winlldp.system_info import SystemInfo
+        from winlldp.neighbor_store import encode_neighbors, decode_neighbors, write_neighbors_file
         log("Modules imported successfully")
         
+        def read_neighbors_file():
+            try:
+                log_file_op("OPEN", neighbors_file, 'rb')
+                with open(neighbors_file, 'rb') as f:
+                    data = decode_neighbors(f.read())
+                log_file_op("CLOSE", neighbors_file)
+                return data
+            except FileNotFoundError:
+                log("No existing neighbors file, creating new one")
+            except Exception as e:
+                log(f"Could not read neighbors file: {e}")
+            return {}
+        
+        def get_file_mtime():
+            try:
+                return os.stat(neighbors_file).st_mtime_ns
+            except OSError:
+                return None
+        
+        def earliest_expiry():
+            return min((n['last_seen'] + n['ttl'] for n in neighbors.values()), default=None)
+        
+        # Neighbors live in memory; packets only update the dict and a
+        # background thread writes a snapshot when something changed. This
+        # process is the only writer of the file while it runs, so updates
+        # are never lost to a concurrent load-then-overwrite
+        neighbors = read_neighbors_file()
+        neighbors_lock = threading.Lock()
+        updated_keys = set()
+        dirty = False
+        written_mtime = get_file_mtime()
+        next_expiry = earliest_expiry()
+        
+        def flush_neighbors():
+            nonlocal dirty, written_mtime, next_expiry
+            now = time.time()
+            # Someone else (e.g. clear-neighbors) rewrote the file since our
+            # last flush: take their content as the new base. The file is
+            # checked and read before taking the lock, which every packet
+            # needs; written_mtime only changes in here
+            changed_externally = get_file_mtime() != written_mtime
+            if changed_externally:
+                log("Neighbors file changed externally, reloading it")
+                base = read_neighbors_file()
+            
+            with neighbors_lock:
+                expired = next_expiry is not None and now > next_expiry
+                if not dirty and not changed_externally and not expired:
+                    return
+                
+                if changed_externally:
+                    for key in updated_keys:
+                        base[key] = neighbors[key]
+                    neighbors.clear()
+                    neighbors.update(base)
+                
+                # Drop neighbors whose TTL ran out
+                if changed_externally or expired:
+                    for key in [k for k, n in neighbors.items() if now > n['last_seen'] + n['ttl']]:
+                        del neighbors[key]
+                    next_expiry = earliest_expiry()
+                
+                payload = encode_neighbors(neighbors)
+                count = len(neighbors)
+                flushed_keys = set(updated_keys)
+                updated_keys.clear()
+                dirty = False
+            
+            # Temp file + rename so readers never see a partial file
+            log_file_op("REPLACE", neighbors_file)
+            try:
+                write_neighbors_file(neighbors_file, payload)
+            except Exception:
+                # Keep the changes pending so the next tick writes them again
+                with neighbors_lock:
+                    updated_keys.update(flushed_keys)
+                    dirty = True
+                raise
+            written_mtime = get_file_mtime()
+            log(f"Saved neighbor data to file ({count} total neighbors)")
+        
+        def flush_loop():
+            while True:
+                time.sleep(FLUSH_INTERVAL)
+                try:
+                    flush_neighbors()
+                except PermissionError as e:
+                    # A reader has the file open; retried on the next tick
+                    log(f"Neighbors file in use, retrying: {e}")
+                except Exception as e:
+                    log(f"Error saving neighbors: {e}")
+        
         def process_lldp_packet(packet):
+            nonlocal dirty, next_expiry
             try:
-                if packet.haslayer(Ether) and packet[Ether].type == 0x88cc:
-                    interface = packet.sniffed_on if hasattr(packet, 'sniffed_on') else 'unknown'
-                    source_mac = packet[Ether].src
-                    log(f"Received LLDP packet from {source_mac} on {interface}")
-                    
-                    lldp_data = bytes(packet)[14:]
-                    lldp_packet = LLDPPacket.decode(lldp_data)
-                    neighbor_data = lldp_packet.to_dict()
-                    
-                    # Save neighbor data directly to file
-                    log(f"Saving to file: {neighbors_file}")
-                    
-                    # Load existing neighbors
-                    try:
-                        log_file_op("OPEN", neighbors_file, 'r')
-                        with open(neighbors_file, 'r') as f:
-                            neighbors = json.load(f)
-                        log_file_op("CLOSE", neighbors_file)
-                    except:
-                        neighbors = {}
-                        log("No existing neighbors file, creating new one")
-                    
-                    # Create neighbor key
-                    chassis_id = neighbor_data.get('chassis_id', '')
-                    key = f"{interface}:{source_mac}:{chassis_id}"
-                    
-                    # Update neighbor
-                    neighbors[key] = {
+                # The BPF filter already guarantees ethertype 0x88cc, so work
+                # on the raw frame instead of Scapy's Ether layer
+                raw = packet.original if getattr(packet, 'original', None) else bytes(packet)
+                interface = packet.sniffed_on if hasattr(packet, 'sniffed_on') else 'unknown'
+                source_mac = raw[6:12].hex(':')
+                log(f"Received LLDP packet from {source_mac} on {interface}")
+                
+                lldp_data = raw[14:]
+                lldp_packet = LLDPPacket.decode(lldp_data)
+                neighbor_data = lldp_packet.to_dict()
+                
+                # Create neighbor key
+                chassis_id = neighbor_data.get('chassis_id', '')
+                key = f"{interface}:{source_mac}:{chassis_id}"
+                
+                # Update neighbor
+                now = time.time()
+                with neighbors_lock:
+                    record = {
                         'interface': interface,
                         'source_mac': source_mac,
                         'data': neighbor_data,
-                        'first_seen': neighbors.get(key, {}).get('first_seen', datetime.now().isoformat()),
-                        'last_seen': datetime.now().isoformat(),
+                        'first_seen': neighbors.get(key, {}).get('first_seen', now),
+                        'last_seen': now,
                         'ttl': neighbor_data.get('ttl', 120)
                     }
-                    
-                    # Save back to file
-                    log_file_op("OPEN", neighbors_file, 'w')
-                    with open(neighbors_file, 'w') as f:
-                        json.dump(neighbors, f, indent=2)
-                    log_file_op("CLOSE", neighbors_file)
-                    
-                    log(f"Saved neighbor data to file ({len(neighbors)} total neighbors)")
-                    
+                    neighbors[key] = record
+                    updated_keys.add(key)
+                    dirty = True
+                    if next_expiry is None or now + record['ttl'] < next_expiry:
+                        next_expiry = now + record['ttl']
+                
             except Exception as e:
                 log(f"Error processing packet: {e}")
                 log(traceback.format_exc())
         
+        flush_thread = threading.Thread(target=flush_loop, daemon=True)
+        flush_thread.start()
+        
         # Get all interfaces
         log("Getting network interfaces...")
         system_info = SystemInfo()
@@ -136,6 +236,21 @@ def main():
         log(f"FATAL ERROR: {e}")
         log(traceback.format_exc())
     finally:
+        # Persist anything received since the last periodic flush
+        if flush_neighbors:
+            for attempt in range(EXIT_FLUSH_ATTEMPTS):
+                try:
+                    flush_neighbors()
+                    break
+                except PermissionError as e:
+                    if attempt == EXIT_FLUSH_ATTEMPTS - 1:
+                        log(f"Could not save neighbors on exit, file in use: {e}")
+                    else:
+                        time.sleep(FLUSH_INTERVAL / 4)
+                except Exception as e:
+                    log(f"Error saving neighbors on exit: {e}")
+                    break
+        
         # Clean up PID file
         try:
             log_file_op("REMOVE", pid_file)
@@ -144,6 +259,8 @@ def main():
         except:
             pass
         log("Capture process exiting")
+        if log_handle:
+            log_handle.close()
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
@@ -7,10 +7,11 @@ import sys
 from tabulate import tabulate
 from .config import Config
 from .lldp_sender import LLDPSender
-from .lldp_receiver import LLDPReceiver
+from .lldp_receiver import LLDPReceiver, format_age
 from .system_info import SystemInfo
 from .file_debug import debug_open as open
 from .file_debug import set_verbose as set_file_verbose
+from .paths import get_runtime_directory, get_service_log_file
 
 
 def setup_logging(verbose):
@@ -158,8 +159,7 @@ def capture_log(lines, verbose):
 def show_neighbors(env_file, watch, verbose):
     """Show discovered LLDP neighbors"""
     setup_logging(verbose)
-    import json
-    from datetime import datetime, timedelta
+    from .neighbor_store import decode_neighbors
     
     config = Config(env_file)
     neighbors_file = config.neighbors_file
@@ -171,9 +171,9 @@ def show_neighbors(env_file, watch, verbose):
             return False
         
         try:
-            with open(neighbors_file, 'r') as f:
-                neighbors_data = json.load(f)
-        except json.JSONDecodeError:
+            with open(neighbors_file, 'rb') as f:
+                neighbors_data = decode_neighbors(f.read())
+        except ValueError:
             click.echo("Error reading neighbors file. It may be corrupted.")
             return False
         except Exception as e:
@@ -182,20 +182,11 @@ def show_neighbors(env_file, watch, verbose):
         
         # Convert to list and calculate age
         neighbors = []
-        now = datetime.now()
+        now = time.time()
         
         for key, neighbor in neighbors_data.items():
             # Calculate age
-            first_seen = datetime.fromisoformat(neighbor['first_seen'])
-            age = now - first_seen
-            
-            # Format age
-            if age.days > 0:
-                age_str = f"{age.days}d {age.seconds // 3600}h"
-            elif age.seconds >= 3600:
-                age_str = f"{age.seconds // 3600}h {(age.seconds % 3600) // 60}m"
-            else:
-                age_str = f"{age.seconds // 60}m {age.seconds % 60}s"
+            age_str = format_age(now - neighbor['first_seen'])
             
             # Get neighbor data
             data = neighbor['data']
@@ -345,14 +336,15 @@ def debug_paths(env_file):
 @click.option('--env-file', '-e', help='Path to .env configuration file')
 def clear_neighbors(env_file):
     """Clear all discovered neighbors"""
+    from .neighbor_store import encode_neighbors, write_neighbors_file
+    
     config = Config(env_file)
     neighbors_file = config.neighbors_file
     
     try:
         if os.path.exists(neighbors_file):
-            # Just write an empty dictionary to the file
-            with open(neighbors_file, 'w') as f:
-                f.write('{}')
+            # Replace the file with an empty table in one step
+            write_neighbors_file(neighbors_file, encode_neighbors({}))
             click.echo(f"Cleared all discovered neighbors from: {neighbors_file}")
         else:
             click.echo(f"No neighbors file found at: {neighbors_file}")
@@ -400,7 +392,7 @@ def service_install(verbose):
         service_args = 'service-run'
     else:
         # Normal Python execution
-        project_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        project_dir = get_runtime_directory()
         service_args = '-m winlldp.service_wrapper'
     
     if verbose:
@@ -513,7 +505,9 @@ def service_install(verbose):
         ['nssm', 'set', 'WinLLDP', 'DisplayName', 'Windows LLDP Service'],
         ['nssm', 'set', 'WinLLDP', 'Description', 'Link Layer Discovery Protocol service for Windows'],
         ['nssm', 'set', 'WinLLDP', 'Start', 'SERVICE_AUTO_START'],
-        ['nssm', 'set', 'WinLLDP', 'AppNoConsole', '1'],
+        # Keep a (hidden) console so NSSM's Ctrl+C stop step reaches the
+        # wrapper and it can shut down cleanly before being terminated
+        ['nssm', 'set', 'WinLLDP', 'AppNoConsole', '0'],
         ['nssm', 'set', 'WinLLDP', 'AppRestartDelay', '5000'],
         ['nssm', 'set', 'WinLLDP', 'AppThrottle', '1500'],
         ['nssm', 'set', 'WinLLDP', 'AppRotateOnline', '1'],
@@ -621,10 +615,7 @@ def service_uninstall(verbose):
                 click.echo("  WARNING: Service may still be registered in Windows")
             
             # Check for leftover files
-            if getattr(sys, 'frozen', False):
-                log_file = os.path.join(os.path.dirname(sys.executable), 'nssm_service.log')
-            else:
-                log_file = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'nssm_service.log')
+            log_file = get_service_log_file()
             
             if os.path.exists(log_file):
                 click.echo(f"\n  Note: Service log file still exists: {log_file}")
@@ -708,17 +699,14 @@ def service_start(verbose):
                 if verbose:
                     click.echo("\nChecking Windows Event Log for errors...")
                     # Check if service wrapper exists
-                    wrapper_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'winlldp', 'service_wrapper.py')
+                    wrapper_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'service_wrapper.py')
                     if os.path.exists(wrapper_path):
                         click.echo(f"  Service wrapper exists: {wrapper_path}")
                     else:
                         click.echo(f"  Service wrapper NOT FOUND: {wrapper_path}")
                     
                     # Check service log file
-                    if getattr(sys, 'frozen', False):
-                        log_path = os.path.join(os.path.dirname(sys.executable), 'nssm_service.log')
-                    else:
-                        log_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'nssm_service.log')
+                    log_path = get_service_log_file()
                     
                     if os.path.exists(log_path):
                         click.echo(f"\nService log file: {log_path}")
@@ -837,11 +825,7 @@ def service_status(verbose):
                 click.echo("  The service is running")
                 
                 # Show additional info from log
-                if getattr(sys, 'frozen', False):
-                    log_file = os.path.join(os.path.dirname(sys.executable), 'nssm_service.log')
-                else:
-                    project_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-                    log_file = os.path.join(project_dir, 'nssm_service.log')
+                log_file = get_service_log_file()
                 if os.path.exists(log_file):
                     # Get last line with status
                     try:
@@ -931,9 +915,7 @@ def capture_subprocess_cmd(log_file, neighbors_file, pid_file):
     """Internal command for running capture subprocess from frozen executable"""
     # This is a hidden command used internally when running from PyInstaller bundle
     from .capture_subprocess import main
-    # Update sys.argv to match what the subprocess expects
-    sys.argv = [sys.argv[0], log_file, neighbors_file, pid_file]
-    main()
+    main([log_file, neighbors_file, pid_file])
 
 
 @cli.command('service-run', hidden=True)
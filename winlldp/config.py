@@ -11,6 +11,18 @@ except ImportError:
 
 
 class Config:
+    # Instances returned by Config.get(), keyed by env_file
+    _instances = {}
+    
+    @classmethod
+    def get(cls, env_file: Optional[str] = None) -> 'Config':
+        """Return a shared Config, loading the environment only once per env_file"""
+        config = cls._instances.get(env_file)
+        if config is None:
+            config = cls(env_file)
+            cls._instances[env_file] = config
+        return config
+    
     def __init__(self, env_file: Optional[str] = None):
         if env_file:
             load_dotenv(env_file)
@@ -151,7 +151,7 @@ class LLDPPacket:
                 subtype = struct.unpack('!B', tlv.value[0:1])[0]
                 value = tlv.value[1:]
                 if subtype == ChassisIdSubtype.MAC_ADDRESS:
-                    result['chassis_id'] = ':'.join(f'{b:02x}' for b in value)
+                    result['chassis_id'] = value.hex(':')
                 else:
                     result['chassis_id'] = value.decode('utf-8', errors='ignore')
                 result['chassis_id_subtype'] = ChassisIdSubtype(subtype).name
@@ -160,7 +160,7 @@ class LLDPPacket:
                 subtype = struct.unpack('!B', tlv.value[0:1])[0]
                 value = tlv.value[1:]
                 if subtype == PortIdSubtype.MAC_ADDRESS:
-                    result['port_id'] = ':'.join(f'{b:02x}' for b in value)
+                    result['port_id'] = value.hex(':')
                 else:
                     result['port_id'] = value.decode('utf-8', errors='ignore')
                 result['port_id_subtype'] = PortIdSubtype(subtype).name
@@ -189,6 +189,6 @@ class LLDPPacket:
                 if addr_type == 1:  # IPv4
                     result['management_address'] = '.'.join(str(b) for b in address)
                 else:
-                    result['management_address'] = ':'.join(f'{b:02x}' for b in address)
+                    result['management_address'] = address.hex(':')
         
         return result
\ No newline at end of file
@@ -1,59 +1,99 @@
+import heapq
+import psutil
 import time
-import json
 import subprocess
 import sys
 import threading
 import os
 import tempfile
-from typing import Dict, List, Optional
-from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from datetime import datetime
 from .lldp_packet import LLDPPacket
 from .system_info import SystemInfo
 from .config import Config
+from .neighbor_store import encode_neighbors, decode_neighbors, write_neighbors_file
 from .logger import get_logger
 from .file_debug import debug_open as open
 
 
+def format_age(seconds: float) -> str:
+    """Format an age in seconds as e.g. '2d 3h', '1h 5m' or '4m 10s'"""
+    days, rem = divmod(max(0, int(seconds)), 86400)
+    hours, rem = divmod(rem, 3600)
+    minutes, secs = divmod(rem, 60)
+    if days:
+        return f"{days}d {hours}h"
+    if hours:
+        return f"{hours}h {minutes}m"
+    return f"{minutes}m {secs}s"
+
+
 class Neighbor:
-    def __init__(self, interface: str, source_mac: str, packet_data: Dict):
+    def __init__(self, interface: str, source_mac: str, packet_data: Dict,
+                 first_seen: Optional[float] = None,
+                 last_seen: Optional[float] = None,
+                 ttl: Optional[int] = None):
+        # Timestamps are epoch seconds (time.time()); datetime is only used
+        # at the display boundary
+        if first_seen is None or last_seen is None:
+            now = time.time()
+            first_seen = first_seen or now
+            last_seen = last_seen or now
         self.interface = interface
         self.source_mac = source_mac
         self.data = packet_data
-        self.first_seen = datetime.now()
-        self.last_seen = datetime.now()
-        self.ttl = packet_data.get('ttl', 120)
+        self.first_seen = first_seen
+        self.last_seen = last_seen
+        self.ttl = ttl if ttl is not None else packet_data.get('ttl', 120)
+        self.expires_at = self.last_seen + self.ttl
         
     def update(self, packet_data: Dict):
         """Update neighbor with new packet data"""
         self.data = packet_data
-        self.last_seen = datetime.now()
+        self.last_seen = time.time()
         self.ttl = packet_data.get('ttl', 120)
+        self.expires_at = self.last_seen + self.ttl
     
-    def is_expired(self) -> bool:
+    def is_expired(self, now: Optional[float] = None) -> bool:
         """Check if neighbor has expired based on TTL"""
-        return datetime.now() > self.last_seen + timedelta(seconds=self.ttl)
+        return (now or time.time()) > self.expires_at
     
-    def get_age(self) -> str:
+    def get_age(self, now: Optional[float] = None) -> str:
         """Get age of neighbor in human-readable format"""
-        age = datetime.now() - self.first_seen
-        if age.days > 0:
-            return f"{age.days}d {age.seconds // 3600}h"
-        elif age.seconds >= 3600:
-            return f"{age.seconds // 3600}h {(age.seconds % 3600) // 60}m"
-        else:
-            return f"{age.seconds // 60}m {age.seconds % 60}s"
+        return format_age((now or time.time()) - self.first_seen)
+    
+    def render(self, now: float) -> Dict:
+        """Get neighbor information as returned by get_neighbors()"""
+        return {
+            'interface': self.interface,
+            'source_mac': self.source_mac,
+            'age': self.get_age(now),
+            'ttl': self.ttl,
+            'expires_in': max(0, int(self.expires_at - now)),
+            **self.data
+        }
 
 
 class LLDPReceiver:
     """LLDP receiver that runs packet capture in a subprocess for better signal handling"""
     
+    # Seconds an is_capture_running() answer is reused
+    RUNNING_CHECK_TTL = 1.0
+    
     # Store subprocess info in a class variable for persistence across instances
     _subprocess_info = None
     _config = None
     
     def __init__(self, config: Optional[Config] = None):
+        # Copy-on-write: writers (holding self.lock) build a new dict and
+        # rebind it, so readers can use the current dict without locking
         self.neighbors: Dict[str, Neighbor] = {}
+        # Min-heap of (expires_at, key); entries are dropped lazily when the
+        # neighbor was refreshed after they were pushed
+        self._expiry_heap: List[Tuple[float, str]] = []
         self.running = False
+        # Set by stop() to wake the background loops immediately
+        self._stop_event = threading.Event()
         self.subprocess = None
         self.reader_thread = None
         self.lock = threading.Lock()
@@ -66,7 +106,7 @@ class LLDPReceiver:
             LLDPReceiver._config = config
         else:
             # Try to use cached config or create new one
-            self.config = LLDPReceiver._config or Config()
+            self.config = LLDPReceiver._config or Config.get()
             LLDPReceiver._config = self.config
         
         # Define file paths from config
@@ -74,6 +114,12 @@ class LLDPReceiver:
         self._pid_file = self.config.pid_file
         self._log_file = self.config.log_file
         
+        # (monotonic time, running, pid) of the last is_capture_running() check
+        self._running_cache = None
+        
+        # mtime of the neighbors file when it was last loaded
+        self._last_mtime = None
+        
         # Load existing neighbors if capture is running
         if self.is_capture_running():
             self._load_neighbors()
@@ -82,81 +128,137 @@ class LLDPReceiver:
     def _save_neighbors(self):
         """Save neighbors to file for persistence"""
         try:
+            # self.neighbors is never modified in place, no lock needed
             data = {}
-            with self.lock:
-                for key, neighbor in self.neighbors.items():
-                    data[key] = {
-                        'interface': neighbor.interface,
-                        'source_mac': neighbor.source_mac,
-                        'data': neighbor.data,
-                        'first_seen': neighbor.first_seen.isoformat(),
-                        'last_seen': neighbor.last_seen.isoformat(),
-                        'ttl': neighbor.ttl
-                    }
+            for key, neighbor in self.neighbors.items():
+                data[key] = {
+                    'interface': neighbor.interface,
+                    'source_mac': neighbor.source_mac,
+                    'data': neighbor.data,
+                    'first_seen': neighbor.first_seen,
+                    'last_seen': neighbor.last_seen,
+                    'ttl': neighbor.ttl
+                }
             
-            with open(self._neighbors_file, 'w') as f:
-                json.dump(data, f)
-        except Exception:
-            pass
+            # Atomic replace so a crash mid-write never leaves a truncated
+            # neighbors file behind
+            write_neighbors_file(self._neighbors_file, encode_neighbors(data))
+        except Exception as e:
+            self.logger.error(f"Error saving neighbors: {e}")
     
-    def _load_neighbors(self):
-        """Load neighbors from file"""
+    def _read_neighbors_payload(self) -> Optional[bytes]:
+        """Read the serialized neighbor table from the neighbors file
+        
+        Returns None when nothing changed since the previous read, so the
+        caller can skip parsing altogether.
+        """
         try:
-            if os.path.exists(self._neighbors_file):
-                with open(self._neighbors_file, 'r') as f:
-                    data = json.load(f)
+            mtime = os.stat(self._neighbors_file).st_mtime_ns
+        except OSError:
+            return None
+        if mtime == self._last_mtime:
+            return None
+        
+        with open(self._neighbors_file, 'rb') as f:
+            payload = f.read()
+        self._last_mtime = mtime
+        return payload
+    
+    def _load_neighbors(self, now: Optional[float] = None):
+        """Load neighbors from the capture subprocess"""
+        try:
+            payload = self._read_neighbors_payload()
+            if payload:
+                data = decode_neighbors(payload)
                 
+                now = now or time.time()
                 with self.lock:
+                    neighbors = dict(self.neighbors)
                     for key, neighbor_data in data.items():
-                        neighbor = Neighbor(
-                            neighbor_data['interface'],
-                            neighbor_data['source_mac'],
-                            neighbor_data['data']
-                        )
-                        neighbor.first_seen = datetime.fromisoformat(neighbor_data['first_seen'])
-                        neighbor.last_seen = datetime.fromisoformat(neighbor_data['last_seen'])
-                        neighbor.ttl = neighbor_data['ttl']
-                        
-                        # Only load non-expired neighbors
-                        if not neighbor.is_expired():
-                            self.neighbors[key] = neighbor
-        except Exception:
+                        self._store_neighbor(neighbors, key, neighbor_data, now)
+                    self._publish_neighbors(neighbors)
+        except FileNotFoundError:
+            # Removed between stat and open (e.g. clear_neighbors)
             pass
+        except Exception as e:
+            # Files are replaced atomically, so this is a real problem
+            self.logger.error(f"Error loading neighbors: {e}")
+    
+    def _publish_neighbors(self, neighbors: Dict[str, Neighbor]):
+        """Make a new neighbors dict current (caller holds the lock)"""
+        self.neighbors = neighbors
+    
+    def _store_neighbor(self, neighbors: Dict[str, Neighbor], key: str,
+                        neighbor_data: Dict, now: float):
+        """Add or refresh one neighbor record in a new neighbors dict
+        
+        The caller holds the lock and publishes the dict afterwards.
+        """
+        neighbor = Neighbor(
+            neighbor_data['interface'],
+            neighbor_data['source_mac'],
+            neighbor_data['data'],
+            first_seen=neighbor_data['first_seen'],
+            last_seen=neighbor_data['last_seen'],
+            ttl=neighbor_data['ttl']
+        )
+        
+        # Only load non-expired neighbors
+        if not neighbor.is_expired(now):
+            previous = neighbors.get(key)
+            neighbors[key] = neighbor
+            if previous is None or previous.expires_at != neighbor.expires_at:
+                heapq.heappush(self._expiry_heap, (neighbor.expires_at, key))
     
     
-    def _cleanup_expired_neighbors(self):
+    def _cleanup_expired_neighbors(self, now: Optional[float] = None):
         """Remove expired neighbors"""
+        now = now or time.time()
+        expired_keys = []
         with self.lock:
-            expired_keys = [
-                key for key, neighbor in self.neighbors.items() 
-                if neighbor.is_expired()
-            ]
-            for key in expired_keys:
-                del self.neighbors[key]
+            while self._expiry_heap and self._expiry_heap[0][0] <= now:
+                expires_at, key = heapq.heappop(self._expiry_heap)
+                neighbor = self.neighbors.get(key)
+                # Skip stale entries for neighbors refreshed since the push
+                if neighbor is not None and neighbor.expires_at == expires_at:
+                    expired_keys.append(key)
+            if expired_keys:
+                neighbors = dict(self.neighbors)
+                for key in expired_keys:
+                    del neighbors[key]
+                self._publish_neighbors(neighbors)
         
-        if expired_keys:
+        # While capture runs, the subprocess owns the file and drops expired
+        # neighbors itself; writing here would race with its flushes
+        if expired_keys and not self.is_capture_running():
             self._save_neighbors()
     
     
-    def is_capture_running(self) -> bool:
-        """Check if capture subprocess is running"""
+    def _read_pid(self) -> Optional[int]:
+        """Read the capture subprocess PID from the PID file"""
         try:
             if os.path.exists(self._pid_file):
                 with open(self._pid_file, 'r') as f:
-                    pid = int(f.read().strip())
-                
-                # Check if process exists on Windows
-                try:
-                    import psutil
-                    return psutil.pid_exists(pid)
-                except:
-                    # Fallback method
-                    os.kill(pid, 0)
-                    return True
+                    return int(f.read().strip())
         except:
-            return False
+            pass
+        return None
+    
+    def is_capture_running(self) -> bool:
+        """Check if capture subprocess is running
+        
+        The answer is cached for RUNNING_CHECK_TTL seconds so that polling
+        callers (get_neighbors, status) don't re-read the PID file each time.
+        """
+        now = time.monotonic()
+        if self._running_cache and now - self._running_cache[0] < self.RUNNING_CHECK_TTL:
+            return self._running_cache[1]
         
-        return False
+        pid = self._read_pid()
+        running = pid is not None and psutil.pid_exists(pid)
+        
+        self._running_cache = (now, running, pid)
+        return running
     
     def start_capture(self) -> bool:
         """Start the LLDP capture subprocess"""
@@ -172,32 +274,25 @@ class LLDPReceiver:
         
         # Start subprocess detached
         # Keep stderr pipe for error checking, but not stdout
-        
-        # Check if running from PyInstaller bundle
+        paths = [log_file, neighbors_file_path, pid_file_path]
         if getattr(sys, 'frozen', False):
-            # We're running from a PyInstaller bundle
-            # Use the capture-subprocess command
-            self.subprocess = subprocess.Popen(
-                [sys.executable, 'capture-subprocess', 
-                 log_file, neighbors_file_path, pid_file_path],
-                stdout=subprocess.DEVNULL,
-                stderr=subprocess.PIPE,
-                text=True,
-                creationflags=subprocess.CREATE_NEW_PROCESS_GROUP if os.name == 'nt' else 0
-            )
+            # PyInstaller bundle: the hidden capture-subprocess command runs
+            # the same capture_subprocess.main
+            command = [sys.executable, 'capture-subprocess'] + paths
         else:
-            # Normal Python execution - use the capture_subprocess module
-            self.subprocess = subprocess.Popen(
-                [sys.executable, '-m', 'winlldp.capture_subprocess',
-                 log_file, neighbors_file_path, pid_file_path],
-                stdout=subprocess.DEVNULL,
-                stderr=subprocess.PIPE,
-                text=True,
-                creationflags=subprocess.CREATE_NEW_PROCESS_GROUP if os.name == 'nt' else 0
-            )
+            command = [sys.executable, '-m', 'winlldp.capture_subprocess'] + paths
+        
+        self.subprocess = subprocess.Popen(
+            command,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            text=True,
+            creationflags=subprocess.CREATE_NEW_PROCESS_GROUP if os.name == 'nt' else 0
+        )
         
         # Save subprocess info
         LLDPReceiver._subprocess_info = self.subprocess
+        self._running_cache = None
         
         self.logger.info(f"Started LLDP capture subprocess (PID: {self.subprocess.pid})")
         
@@ -220,17 +315,24 @@ class LLDPReceiver:
                 with open(self._pid_file, 'r') as f:
                     pid = int(f.read().strip())
                 
-                # Terminate the process
-                if os.name == 'nt':
-                    subprocess.run(['taskkill', '/F', '/PID', str(pid)], capture_output=True)
-                else:
-                    os.kill(pid, 9)
+                # Terminate the process (TerminateProcess on Windows, no
+                # taskkill spawn) and make sure it is gone
+                try:
+                    process = psutil.Process(pid)
+                    process.terminate()
+                    try:
+                        process.wait(timeout=3)
+                    except psutil.TimeoutExpired:
+                        process.kill()
+                except psutil.NoSuchProcess:
+                    pass
                 
                 # Clean up files
                 try:
                     os.remove(self._pid_file)
                 except:
                     pass
+                self._running_cache = None
                 
                 self.logger.info(f"Stopped LLDP capture subprocess (PID: {pid})")
                 return True
@@ -246,13 +348,13 @@ class LLDPReceiver:
         """Get status of capture subprocess"""
         if self.is_capture_running():
             try:
-                with open(self._pid_file, 'r') as f:
-                    pid = int(f.read().strip())
+                # PID memoized by is_capture_running()
+                pid = self._running_cache[2]
                 
                 # Get process info
                 try:
-                    import psutil
                     process = psutil.Process(pid)
+                    cpu_percent = process.cpu_percent(interval=0.1)
                     create_time = datetime.fromtimestamp(process.create_time())
                     uptime = datetime.now() - create_time
                     
@@ -261,7 +363,7 @@ class LLDPReceiver:
                         'pid': pid,
                         'uptime': str(uptime).split('.')[0],
                         'memory_mb': process.memory_info().rss / 1024 / 1024,
-                        'cpu_percent': process.cpu_percent(interval=0.1)
+                        'cpu_percent': cpu_percent
                     }
                 except:
                     return {
@@ -283,59 +385,50 @@ class LLDPReceiver:
         }
     
     def start(self):
-        """Start the LLDP receiver (just starts cleanup thread for file-based operation)"""
+        """Start the LLDP receiver (starts the cleanup thread)"""
         if self.running:
             return
         
         self.running = True
+        self._stop_event.clear()
         
-        # Don't try to connect to subprocess stdout - we use file-based communication
-        # Just start cleanup thread
         cleanup_thread = threading.Thread(target=self._cleanup_loop, daemon=True)
         cleanup_thread.start()
     
     def _cleanup_loop(self):
         """Periodic cleanup of expired neighbors"""
-        while self.running:
-            time.sleep(5)
+        while not self._stop_event.wait(5):
             self._cleanup_expired_neighbors()
     
     def stop(self):
         """Stop the LLDP receiver (keeps capture running)"""
         self.running = False
+        self._stop_event.set()
         
         # Note: We don't stop the capture subprocess here
         # Use stop_capture() to actually stop the capture
     
     def get_neighbors(self) -> List[Dict]:
         """Get list of current neighbors"""
+        # One timestamp for the whole call
+        now = time.time()
+        
         # Reload from file to get latest data
         if self.is_capture_running():
-            self._load_neighbors()
+            self._load_neighbors(now)
         
-        with self.lock:
-            # Cleanup expired first
-            self._cleanup_expired_neighbors()
-            
-            # Return neighbor information
-            neighbors = []
-            for neighbor in self.neighbors.values():
-                neighbor_info = {
-                    'interface': neighbor.interface,
-                    'source_mac': neighbor.source_mac,
-                    'age': neighbor.get_age(),
-                    'ttl': neighbor.ttl,
-                    'expires_in': max(0, (neighbor.last_seen + timedelta(seconds=neighbor.ttl) - datetime.now()).seconds),
-                    **neighbor.data
-                }
-                neighbors.append(neighbor_info)
-            
-            return neighbors
+        # Cleanup expired first (takes the lock itself)
+        self._cleanup_expired_neighbors(now)
+        
+        # Return neighbor information; self.neighbors is never modified in
+        # place, so no lock is needed
+        return [neighbor.render(now) for neighbor in self.neighbors.values()]
     
     def clear_neighbors(self):
         """Clear all discovered neighbors"""
         with self.lock:
-            self.neighbors.clear()
+            self._expiry_heap.clear()
+            self._publish_neighbors({})
         
         # Clear the file too
         try:
@@ -1,10 +1,8 @@
-import time
 import threading
 import socket
 import struct
 import platform
 from typing import List, Optional
-from scapy.all import sendp, Ether
 from .lldp_packet import (
     LLDPPacket, 
     ChassisIdSubtype, 
@@ -19,24 +17,120 @@ from .logger import get_logger
 class LLDPSender:
     LLDP_MULTICAST_MAC = "01:80:c2:00:00:0e"
     LLDP_ETHERTYPE = 0x88cc
+    # LLDP-MED uses TIA OUI: 00-12-BB
+    LLDP_MED_OUI = b'\x00\x12\xBB'
+    # LLDP-MED Capabilities TLV (subtype 1) body
+    # Indicates this is an endpoint device
+    LLDP_MED_CAPABILITIES = struct.pack('!HBB',
+        0x0001,  # Capabilities: LLDP-MED capabilities supported
+        0x03,    # Device type: 3 = Endpoint Class III
+        0        # Reserved
+    )
 
     def __init__(self, config: Config):
         self.config = config
         self.running = False
         self.thread = None
+        # Set by stop() to wake the sender loop immediately
+        self._stop_event = threading.Event()
         self.system_info = SystemInfo()
         self.logger = get_logger()
+        # Encoded fixed TLVs per (interface, config) - see create_lldp_packet
+        self._packet_cache = {}
+        # Windows edition for the LLDP-MED model name, read once from the registry
+        self._os_caption = self.system_info.get_os_caption()
+        # Open L2 socket and Ethernet header per interface name
+        self._sockets = {}
+        # Interface name -> index, and the get_interfaces() snapshot it was
+        # built from; rebuilt with every new snapshot so re-created adapters
+        # pick up their new index
+        self._interface_indexes = {}
+        self._indexes_snapshot = None
 
-    def create_lldp_packet(self, interface_info: dict, minimal: bool = False) -> bytes:
-        """Create an LLDP packet for a specific interface. If minimal=True, only required TLVs are included."""
+    def create_lldp_packet(self, interface_info: dict, minimal: bool = False,
+                           metadata: Optional[dict] = None) -> bytes:
+        """Create an LLDP packet for a specific interface. If minimal=True, only required TLVs are included.
+        
+        metadata is the per-cycle lookup result from _get_send_metadata(); it
+        is computed for this interface alone when not given.
+        """
+        if metadata is None:
+            metadata = self._get_send_metadata(self.system_info.get_interfaces(), minimal,
+                                               [interface_info])
+        # Everything but the management address is fixed for a given
+        # interface and configuration, so it is encoded once and reused
+        system_name = metadata['system_name']
+        key = (interface_info['name'], interface_info['mac'], minimal, self.config.ttl,
+               self.config.port_description, system_name)
+        prefix = self._packet_cache.get(key)
+        if prefix is None:
+            prefix = self._create_static_tlvs(interface_info, minimal, system_name)
+            self._packet_cache[key] = prefix
+        
+        packet = LLDPPacket()
+        if not minimal:
+            # Management Address TLV enabled
+            mgmt_addr = self.config.management_address
+            addr_bytes = None
+            if mgmt_addr == 'auto':
+                if interface_info['ipv4']:
+                    mgmt_addr = interface_info['ipv4'][0]
+                    # Packed once per interface snapshot by get_interfaces()
+                    packed = interface_info.get('ipv4_bytes')
+                    if packed:
+                        addr_bytes = packed[0]
+                else:
+                    mgmt_addr = metadata['primary_ip']
+            if mgmt_addr:
+                if addr_bytes is None:
+                    addr_bytes = self.system_info.ip_to_bytes(mgmt_addr)
+                if addr_bytes:
+                    interface_idx = metadata['indexes'].get(interface_info['name'], 0)
+                    packet.add_management_address(1, addr_bytes, interface_idx)  # 1 = IPv4
+        # End of LLDPDU
+        packet.add_end_of_lldpdu()
+        return prefix + packet.encode()
+
+    def _get_send_metadata(self, interfaces: List[dict], minimal: bool,
+                           targets: Optional[List[dict]] = None) -> dict:
+        """Look up the interface metadata needed by one send cycle, once
+        
+        interfaces is the full get_interfaces() list; targets are the
+        interfaces packets will be sent on (the active ones by default).
+        """
+        system_name = self.config.system_name
+        if system_name == 'auto':
+            system_name = self.system_info.get_hostname()
+        if minimal:
+            # No management address TLV, nothing else to look up
+            return {'indexes': {}, 'primary_ip': None, 'system_name': system_name}
+        
+        if targets is None:
+            targets = [i for i in interfaces if i['is_up'] and i['mac']]
+        # The primary IP is only used for interfaces without an IPv4 address
+        primary_ip = None
+        if self.config.management_address == 'auto' and any(not i['ipv4'] for i in targets):
+            primary_ip = self.system_info.get_primary_ip()
+        # Only enumerate adapters again for a new interface snapshot (or an
+        # interface that is new to us)
+        if (interfaces is not self._indexes_snapshot
+                or any(i['name'] not in self._interface_indexes for i in targets)):
+            self._interface_indexes = self.system_info.get_interface_indexes(interfaces)
+            self._indexes_snapshot = interfaces
+        return {
+            'indexes': self._interface_indexes,
+            'primary_ip': primary_ip,
+            'system_name': system_name
+        }
+
+    def _create_static_tlvs(self, interface_info: dict, minimal: bool, system_name: str) -> bytes:
+        """Encode the TLVs that do not change between transmissions"""
         packet = LLDPPacket()
-        # Chassis ID (MAC address)
         if interface_info['mac']:
             mac_bytes = self.system_info.get_mac_address_bytes(interface_info['mac'])
+            # Chassis ID (MAC address)
             packet.add_chassis_id(ChassisIdSubtype.MAC_ADDRESS, mac_bytes)
-        # Port ID (MAC address)
-        if interface_info['mac']:
-            mac_bytes = self.system_info.get_mac_address_bytes(interface_info['mac'])
+            # Port ID (MAC address)
             packet.add_port_id(PortIdSubtype.MAC_ADDRESS, mac_bytes)
         # TTL
         packet.add_ttl(self.config.ttl)
@@ -45,26 +139,16 @@ class LLDPSender:
             port_desc = self.config.port_description or interface_info['name']
             packet.add_port_description(port_desc)
             # System Name (Identity)
-            system_name = self.config.system_name
-            if system_name == 'auto':
-                system_name = self.system_info.get_hostname()
             packet.add_system_name(system_name)
             # System Description (Platform)
             # Always use detailed Windows platform/version info for System Description
             system_desc = self.system_info.get_system_description()
             packet.add_system_description(system_desc)
             # Add LLDP-MED TLVs that MikroTik might parse for platform/version
-            # LLDP-MED uses TIA OUI: 00-12-BB
-            lldp_med_oui = b'\x00\x12\xBB'
+            lldp_med_oui = self.LLDP_MED_OUI
             
             # LLDP-MED Capabilities TLV (subtype 1)
-            # Indicates this is an endpoint device
-            med_caps = struct.pack('!HBB', 
-                0x0001,  # Capabilities: LLDP-MED capabilities supported
-                0x03,    # Device type: 3 = Endpoint Class III
-                0        # Reserved
-            )
-            packet.add_organizationally_specific(lldp_med_oui, 1, med_caps)
+            packet.add_organizationally_specific(lldp_med_oui, 1, self.LLDP_MED_CAPABILITIES)
             
             # Hardware Revision TLV (subtype 5) - use for platform
             hw_revision = platform.machine().encode('utf-8')  # e.g., "AMD64"
@@ -79,45 +163,22 @@ class LLDPSender:
             packet.add_organizationally_specific(lldp_med_oui, 7, sw_revision)
             
             # Model Name TLV (subtype 9) - use Windows edition
-            try:
-                import subprocess
-                result = subprocess.run(['wmic', 'os', 'get', 'Caption', '/value'], 
-                                      capture_output=True, text=True, shell=True)
-                if result.returncode == 0:
-                    for line in result.stdout.split('\n'):
-                        if line.startswith('Caption='):
-                            model = line.split('=', 1)[1].strip()
-                            packet.add_organizationally_specific(lldp_med_oui, 9, model.encode('utf-8'))
-                            break
-            except:
-                pass
+            if self._os_caption:
+                packet.add_organizationally_specific(lldp_med_oui, 9, self._os_caption.encode('utf-8'))
             # System Capabilities (Version info)
             capabilities, enabled = self.system_info.get_system_capabilities()
             packet.add_system_capabilities(capabilities, enabled)
-            # Management Address TLV enabled
-            mgmt_addr = self.config.management_address
-            if mgmt_addr == 'auto':
-                if interface_info['ipv4']:
-                    mgmt_addr = interface_info['ipv4'][0]
-                else:
-                    mgmt_addr = self.system_info.get_primary_ip()
-            if mgmt_addr:
-                addr_bytes = self.system_info.ip_to_bytes(mgmt_addr)
-                if addr_bytes:
-                    interface_idx = self.system_info.get_interface_index(interface_info['name'])
-                    packet.add_management_address(1, addr_bytes, interface_idx)  # 1 = IPv4
-        # End of LLDPDU
-        packet.add_end_of_lldpdu()
         return packet.encode()
 
-    def send_lldp_on_interface(self, interface_info: dict, verbose: bool = False):
+    def send_lldp_on_interface(self, interface_info: dict, verbose: bool = False,
+                               metadata: Optional[dict] = None):
         """Send LLDP packet on a specific interface"""
         if not interface_info['mac'] or not interface_info['is_up']:
             return
         try:
             # Use minimal TLVs if configured
             minimal = getattr(self.config, 'minimal_tlv', False)
-            lldp_data = self.create_lldp_packet(interface_info, minimal=minimal)
+            lldp_data = self.create_lldp_packet(interface_info, minimal=minimal, metadata=metadata)
             if verbose:
                 print(f"Sending LLDP on {interface_info['name']} ({interface_info['mac']})")
                 print(f"  Destination: {self.LLDP_MULTICAST_MAC}")
@@ -143,52 +204,102 @@ class LLDPSender:
                 except Exception as e:
                     print(f"    Error decoding packet: {e}")
                     print("")
-            ether = Ether(
-                dst=self.LLDP_MULTICAST_MAC,
-                src=interface_info['mac'],
-                type=self.LLDP_ETHERTYPE
-            )
-            frame = ether / lldp_data
-            sendp(frame, iface=interface_info['name'], verbose=verbose)
+            sock, eth_header = self._get_socket(interface_info)
+            try:
+                sock.send(eth_header + lldp_data)
+            except Exception:
+                # Adapter may have been reset; reopen on the next send
+                self._close_socket(interface_info['name'])
+                raise
             if verbose:
                 print(f"  Sent successfully!")
         except Exception as e:
             self.logger.error(f"Error sending LLDP on {interface_info['name']}: {e}")
 
+    def _get_socket(self, interface_info: dict):
+        """Return the (socket, Ethernet header) kept open for an interface"""
+        name = interface_info['name']
+        entry = self._sockets.get(name)
+        if entry is None or entry[2] != interface_info['mac']:
+            # scapy is slow to import; only load it once we actually send
+            from scapy.all import conf
+            self._close_socket(name)
+            eth_header = struct.pack(
+                '!6s6sH',
+                self.system_info.get_mac_address_bytes(self.LLDP_MULTICAST_MAC),
+                self.system_info.get_mac_address_bytes(interface_info['mac']),
+                self.LLDP_ETHERTYPE
+            )
+            entry = (self._open_l2socket(conf, name, interface_info['mac']), eth_header,
+                     interface_info['mac'])
+            self._sockets[name] = entry
+        return entry[0], entry[1]
+
+    @staticmethod
+    def _open_l2socket(conf, name: str, mac: str):
+        """Open a send-only L2 socket for an interface
+        
+        The socket stays open, so it must not put the NIC in promiscuous
+        mode and its filter only matches our own LLDP frames, keeping the
+        capture buffer (nobody reads it) from filling with segment traffic.
+        """
+        try:
+            return conf.L2socket(iface=name, promisc=False,
+                                 filter=f"ether proto 0x88cc and ether src {mac}")
+        except Exception:
+            # Filter could not be compiled (e.g. no libpcap on Linux)
+            return conf.L2socket(iface=name, promisc=False)
+
+    def _close_socket(self, name: str):
+        """Close the L2 socket of an interface, if any"""
+        entry = self._sockets.pop(name, None)
+        if entry:
+            try:
+                entry[0].close()
+            except Exception:
+                pass
+
     def send_lldp(self, verbose: bool = False):
         """Send LLDP packets on all configured interfaces"""
-        interfaces = self.system_info.get_interfaces()
+        minimal = getattr(self.config, 'minimal_tlv', False)
         
         if self.config.interface == 'all':
             # Send on all active interfaces with MAC addresses
-            for interface in interfaces:
-                if interface['is_up'] and interface['mac']:
-                    self.send_lldp_on_interface(interface, verbose)
+            interfaces = self.system_info.get_interfaces()
+            active = [i for i in interfaces if i['is_up'] and i['mac']]
+            self._forget_inactive({i['name'] for i in active})
+            metadata = self._get_send_metadata(interfaces, minimal, active)
+            for interface in active:
+                self.send_lldp_on_interface(interface, verbose, metadata)
         else:
             # Send on specific interface
             interface = self.system_info.get_interface_by_name(self.config.interface)
+            self._forget_inactive({interface['name']} if interface else set())
             if interface:
                 self.send_lldp_on_interface(interface, verbose)
             else:
                 self.logger.error(f"Interface {self.config.interface} not found")
 
+    def _forget_inactive(self, active_names: set):
+        """Close sockets and drop cached TLVs of interfaces no longer sent on"""
+        for name in [n for n in self._sockets if n not in active_names]:
+            self._close_socket(name)
+        for key in [k for k in self._packet_cache if k[0] not in active_names]:
+            del self._packet_cache[key]
+
     def _sender_loop(self):
         """Main sender loop"""
         while self.running:
             try:
                 self.send_lldp()
-                # Sleep in small intervals to allow quick shutdown
-                for _ in range(self.config.interval * 10):
-                    if not self.running:
-                        break
-                    time.sleep(0.1)
+                # Wait for the next interval; returns early on stop()
+                if self._stop_event.wait(self.config.interval):
+                    break
             except Exception as e:
                 self.logger.error(f"Error in LLDP sender loop: {e}")
-                # Wait before retrying, but check running flag
-                for _ in range(50):  # 5 seconds in 0.1s intervals
-                    if not self.running:
-                        break
-                    time.sleep(0.1)
+                # Wait before retrying, unless stopped meanwhile
+                if self._stop_event.wait(5):
+                    break
 
     def start(self):
         """Start the LLDP sender thread"""
@@ -196,14 +307,18 @@ class LLDPSender:
             return
         
         self.running = True
+        self._stop_event.clear()
         self.thread = threading.Thread(target=self._sender_loop, daemon=True)
         self.thread.start()
 
     def stop(self):
         """Stop the LLDP sender thread"""
         self.running = False
+        self._stop_event.set()
         if self.thread:
             self.thread.join(timeout=5)
+        for name in list(self._sockets):
+            self._close_socket(name)
 
     def send_once(self, verbose: bool = False):
         """Send LLDP packets once (for CLI command)"""
@@ -5,6 +5,38 @@ import os
 import sys
 
 
+class EventLogHandler(logging.Handler):
+    """Forward INFO and ERROR records to the Windows Event Log"""
+    
+    def __init__(self, source, level=logging.INFO):
+        super().__init__(level)
+        # Message prefix; not self.name, which is logging.Handler's registry name
+        self.source = source
+        # servicemanager is imported on the first record so CLI startup
+        # does not load pywin32; False once the import has failed
+        self.servicemanager = None
+    
+    def emit(self, record):
+        if record.levelno != logging.INFO and record.levelno < logging.ERROR:
+            return
+        try:
+            if self.servicemanager is None:
+                try:
+                    import servicemanager
+                    self.servicemanager = servicemanager
+                except ImportError:
+                    self.servicemanager = False
+            if not self.servicemanager:
+                return
+            message = f"{self.source}: {record.getMessage()}"
+            if record.levelno >= logging.ERROR:
+                self.servicemanager.LogErrorMsg(message)
+            else:
+                self.servicemanager.LogInfoMsg(message)
+        except Exception:
+            pass
+
+
 class ServiceLogger:
     """Logger that works both in console and Windows service mode"""
     
@@ -39,26 +71,17 @@ class ServiceLogger:
             ch.setLevel(logging.INFO)
             ch.setFormatter(formatter)
             self.logger.addHandler(ch)
+        
+        # Windows Event Log if available
+        self.logger.addHandler(EventLogHandler(self.name))
     
     def info(self, message):
         """Log info message"""
         self.logger.info(message)
-        # Also try to log to Windows Event Log if available
-        try:
-            import servicemanager
-            servicemanager.LogInfoMsg(f"{self.name}: {message}")
-        except:
-            pass
     
     def error(self, message):
         """Log error message"""
         self.logger.error(message)
-        # Also try to log to Windows Event Log if available
-        try:
-            import servicemanager
-            servicemanager.LogErrorMsg(f"{self.name}: {message}")
-        except:
-            pass
     
     def debug(self, message):
         """Log debug message"""
@@ -0,0 +1,75 @@
+"""Serialization of the neighbor table shared by capture, receiver and CLI
+
+The table is a dict of key -> record, where each record has 'interface',
+'source_mac', 'data', 'first_seen', 'last_seen' and 'ttl'. Timestamps are
+epoch seconds as floats (time.time()). On disk the table is stored as
+MessagePack. Older JSON files with ISO timestamps are still accepted
+when decoding.
+"""
+import json
+import os
+import tempfile
+from datetime import datetime
+from typing import Any, Dict
+
+import msgpack
+
+_TIMESTAMP_FIELDS = ('first_seen', 'last_seen')
+
+
+def _from_iso(value: str) -> float:
+    return datetime.fromisoformat(value).timestamp()
+
+
+def write_neighbors_file(neighbors_file: str, payload: bytes):
+    """Atomically replace the neighbors file with a serialized table
+
+    The payload goes to a unique temp file in the same directory, is synced
+    to disk and then renamed over the target, so readers (and a crash) only
+    ever see the old or the new table.
+    """
+    directory, name = os.path.split(os.path.abspath(neighbors_file))
+    fd, tmp_file = tempfile.mkstemp(dir=directory, prefix=f".{name}.", suffix='.tmp')
+    try:
+        if hasattr(os, 'fchmod'):
+            # mkstemp creates the file private; keep the table readable by
+            # other users like a normally created file
+            os.fchmod(fd, 0o644)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, neighbors_file)
+    except BaseException:
+        try:
+            os.remove(tmp_file)
+        except OSError:
+            pass
+        raise
+
+
+def encode_neighbors(neighbors: Dict[str, Dict[str, Any]]) -> bytes:
+    """Serialize a neighbor table"""
+    return msgpack.packb(neighbors, use_bin_type=True)
+
+
+def decode_neighbors(payload: bytes) -> Dict[str, Dict[str, Any]]:
+    """Deserialize a neighbor table, returning timestamps as epoch seconds
+
+    Raises ValueError if the payload is corrupt.
+    """
+    if payload.lstrip()[:1] == b'{':
+        # Legacy JSON format with ISO 8601 timestamps
+        data = json.loads(payload)
+        legacy = True
+    else:
+        data = msgpack.unpackb(payload, raw=False)
+        legacy = False
+    if not isinstance(data, dict):
+        raise ValueError("Neighbors payload is not a table")
+
+    if legacy:
+        for record in data.values():
+            for field in _TIMESTAMP_FIELDS:
+                record[field] = _from_iso(record[field])
+    return data
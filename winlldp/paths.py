@@ -2,6 +2,9 @@
 import os
 import sys
 
+# Project root when running from source
+_PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
 
 def get_runtime_directory():
     """Get the appropriate runtime directory for data files
@@ -14,7 +17,7 @@ def get_runtime_directory():
         return os.path.dirname(sys.executable)
     else:
         # In development, use project root
-        return os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        return _PROJECT_DIR
 
 
 def get_neighbors_file():
@@ -3,6 +3,7 @@
 
 import sys
 import os
+import atexit
 import time
 import traceback
 
@@ -14,7 +15,52 @@ if not getattr(sys, 'frozen', False):
 from winlldp.config import Config
 from winlldp.lldp_sender import LLDPSender
 from winlldp.lldp_receiver import LLDPReceiver
-from winlldp.file_debug import debug_open as open
+
+try:
+    import win32api
+    import win32event
+except ImportError:
+    # Not on Windows (or pywin32 missing): fall back to time.sleep
+    win32event = None
+
+# Seconds between "Service is running..." log lines
+HEARTBEAT_INTERVAL = 60
+
+# Write buffer of the service log; it is flushed on the heartbeat, on
+# errors and at shutdown rather than after every line
+LOG_BUFFER_SIZE = 64 * 1024
+
+# Size at which the service log is rotated to <log>.1 (one backup is kept)
+LOG_MAX_SIZE = 10 * 1024 * 1024
+
+
+def _stop_waiter():
+    """Return wait(timeout) -> True once a console stop signal arrived
+    
+    On Windows the wait is on an event set by a console control handler, so
+    Ctrl+C/Ctrl+Break/close end it immediately. NSSM sends Ctrl+C as its
+    first stop step, which only reaches the wrapper because the service is
+    installed with AppNoConsole 0. Elsewhere it just sleeps and Ctrl+C
+    raises KeyboardInterrupt.
+    """
+    if win32event is None:
+        def wait(timeout):
+            time.sleep(timeout)
+            return False
+        return wait
+    
+    stop_event = win32event.CreateEvent(None, True, False, None)
+    
+    def on_console_ctrl(ctrl_type):
+        win32event.SetEvent(stop_event)
+        return True
+    
+    win32api.SetConsoleCtrlHandler(on_console_ctrl, True)
+    
+    def wait(timeout):
+        result = win32event.WaitForSingleObject(stop_event, int(timeout * 1000))
+        return result != win32event.WAIT_TIMEOUT
+    return wait
 
 
 def main():
@@ -25,11 +71,34 @@ def main():
     # Use centralized path for log file
     log_file = get_service_log_file()
     
-    def log(msg):
+    # Open the log once, buffered, instead of on every message
+    log_handle = open(log_file, 'ab', buffering=LOG_BUFFER_SIZE)
+    atexit.register(lambda: log_handle.close())
+    
+    # Last logged second and its encoded "[timestamp] " line prefix
+    ts_cache = [None, b'']
+    
+    def log(msg, flush=False):
         """Write to log file"""
-        with open(log_file, 'a', encoding='utf-8') as f:
-            f.write(f"[{time.strftime('%Y-%m-%d %H:%M:%S')}] {msg}\n")
-            f.flush()
+        now = int(time.time())
+        if now != ts_cache[0]:
+            stamp = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(now))
+            ts_cache[:] = [now, f"[{stamp}] ".encode('ascii')]
+        log_handle.write(ts_cache[1] + str(msg).encode('utf-8') + b'\n')
+        if flush:
+            log_handle.flush()
+    
+    def rotate_log():
+        """Move the log to <log>.1 once it grows past LOG_MAX_SIZE"""
+        nonlocal log_handle
+        if log_handle.tell() < LOG_MAX_SIZE:
+            return
+        log_handle.close()
+        try:
+            os.replace(log_file, log_file + '.1')
+        except OSError:
+            pass
+        log_handle = open(log_file, 'ab', buffering=LOG_BUFFER_SIZE)
     
     try:
         log("=" * 60)
@@ -39,7 +108,7 @@ def main():
         
         # Ensure we're in the runtime directory (exe directory when frozen)
         runtime_dir = get_runtime_directory()
-        if os.getcwd() != runtime_dir:
+        if os.path.normcase(os.getcwd()) != os.path.normcase(runtime_dir):
             os.chdir(runtime_dir)
             log(f"Changed directory to: {os.getcwd()}")
         else:
@@ -47,7 +116,7 @@ def main():
         
         # Create configuration
         log("Creating configuration...")
-        config = Config()
+        config = Config.get()
         
         # Create components
         log("Creating components...")
@@ -62,29 +131,38 @@ def main():
             if receiver.start_capture():
                 log("Capture started successfully")
             else:
-                log("WARNING: Failed to start capture subprocess")
+                log("WARNING: Failed to start capture subprocess", flush=True)
         
         # Start sender
         log("Starting LLDP sender...")
         sender.start()
-        log("Service started successfully")
+        log("Service started successfully", flush=True)
         
-        # Keep running until interrupted
+        # Keep running until stopped, logging a heartbeat on a fixed
+        # schedule (time spent logging does not push the next one back)
+        wait_for_stop = _stop_waiter()
+        next_heartbeat = time.monotonic() + HEARTBEAT_INTERVAL
         try:
-            while True:
-                time.sleep(60)
-                log("Service is running...")
+            while not wait_for_stop(max(0, next_heartbeat - time.monotonic())):
+                # Skip ticks missed while the process was stalled or the host
+                # suspended instead of logging a burst to catch up
+                now = time.monotonic()
+                while next_heartbeat <= now:
+                    next_heartbeat += HEARTBEAT_INTERVAL
+                log("Service is running...", flush=True)
+                rotate_log()
         except KeyboardInterrupt:
-            log("Stopping sender...")
-            sender.stop()
-            log("Service stopped")
+            pass
+        log("Stopping sender...", flush=True)
+        sender.stop()
+        log("Service stopped", flush=True)
             
     except KeyboardInterrupt:
         log("Received keyboard interrupt")
-        log("Service stopped")
+        log("Service stopped", flush=True)
     except Exception as e:
         log(f"FATAL ERROR: {e}")
-        log(traceback.format_exc())
+        log(traceback.format_exc(), flush=True)
         sys.exit(1)
 
 
@@ -1,8 +1,102 @@
+import functools
 import socket
 import platform
+import time
 import psutil
 from typing import Dict, List, Optional, Tuple
 
+# Seconds a get_interfaces() snapshot is reused; well below the LLDP
+# send interval so adapter changes are still picked up promptly
+INTERFACES_TTL = 2.0
+
+# Last snapshot plus a lookup by interface name
+_interfaces_cache = {'time': None, 'interfaces': None, 'by_name': {}}
+
+# Last get_primary_ip() result, reused for INTERFACES_TTL seconds
+_primary_ip_cache = {'time': None, 'ip': None}
+
+
+def _adapter_indexes() -> Dict[str, int]:
+    """Map adapter friendly names and descriptions to interface indexes
+    
+    Uses the IP Helper GetAdaptersAddresses call through ctypes, which is
+    much cheaper than a WMI query. Raises if IP Helper is not available.
+    """
+    import ctypes
+    from ctypes import wintypes
+    
+    class IP_ADAPTER_ADDRESSES(ctypes.Structure):
+        # Only the leading fields we read; the buffer holds the full structure
+        pass
+    IP_ADAPTER_ADDRESSES._fields_ = [
+        ('Length', wintypes.ULONG),
+        ('IfIndex', wintypes.DWORD),
+        ('Next', ctypes.POINTER(IP_ADAPTER_ADDRESSES)),
+        ('AdapterName', ctypes.c_char_p),
+        ('FirstUnicastAddress', ctypes.c_void_p),
+        ('FirstAnycastAddress', ctypes.c_void_p),
+        ('FirstMulticastAddress', ctypes.c_void_p),
+        ('FirstDnsServerAddress', ctypes.c_void_p),
+        ('DnsSuffix', ctypes.c_wchar_p),
+        ('Description', ctypes.c_wchar_p),
+        ('FriendlyName', ctypes.c_wchar_p),
+        ('PhysicalAddress', ctypes.c_ubyte * 8),
+        ('PhysicalAddressLength', wintypes.ULONG),
+        ('Flags', wintypes.ULONG),
+        ('Mtu', wintypes.DWORD),
+        ('IfType', wintypes.DWORD),
+        ('OperStatus', ctypes.c_int),
+        ('Ipv6IfIndex', wintypes.DWORD),
+    ]
+    
+    get_adapters = ctypes.windll.iphlpapi.GetAdaptersAddresses
+    # AF_UNSPEC; skip the unicast/anycast/multicast/DNS address lists
+    family, flags = 0, 0x0F
+    size = wintypes.ULONG(16 * 1024)
+    for _ in range(3):
+        buffer = ctypes.create_string_buffer(size.value)
+        result = get_adapters(family, flags, None, buffer, ctypes.byref(size))
+        if result != 111:  # ERROR_BUFFER_OVERFLOW: size now holds what is needed
+            break
+    if result == 232:  # ERROR_NO_DATA
+        return {}
+    if result != 0:
+        raise OSError(f"GetAdaptersAddresses failed with error {result}")
+    
+    indexes = {}
+    adapter = ctypes.cast(buffer, ctypes.POINTER(IP_ADAPTER_ADDRESSES))
+    while adapter:
+        entry = adapter.contents
+        # IfIndex is 0 when IPv4 is disabled on the adapter
+        index = entry.IfIndex or entry.Ipv6IfIndex
+        for name in (entry.FriendlyName, entry.Description):
+            if name and name not in indexes:
+                indexes[name] = index
+        adapter = entry.Next
+    return indexes
+
+
+def _best_route_ip() -> Optional[str]:
+    """IPv4 address of the interface the routing table uses for 8.8.8.8
+    
+    Uses IP Helper GetBestInterface, so no socket is created. Raises if IP
+    Helper is not available.
+    """
+    import ctypes
+    
+    index = ctypes.c_ulong()
+    # The address is in network byte order (8.8.8.8 reads the same either way)
+    result = ctypes.windll.iphlpapi.GetBestInterface(ctypes.c_ulong(0x08080808),
+                                                     ctypes.byref(index))
+    if result != 0:
+        return None
+    for name, adapter_index in _adapter_indexes().items():
+        if adapter_index == index.value:
+            interface = SystemInfo.get_interface_by_name(name)
+            if interface and interface['ipv4']:
+                return interface['ipv4'][0]
+    return None
+
 
 class SystemInfo:
     @staticmethod
@@ -10,14 +104,42 @@ class SystemInfo:
         return socket.gethostname()
 
     @staticmethod
+    @functools.lru_cache(maxsize=1)
     def get_system_description() -> str:
+        """Describe the OS and machine (constant for the process lifetime)"""
         system = platform.system()
         version = platform.version()
         machine = platform.machine()
         return f"{system} {version} {machine}"
 
+    @staticmethod
+    def get_os_caption() -> Optional[str]:
+        """Get the Windows edition name (same as Win32_OperatingSystem.Caption)"""
+        try:
+            import winreg
+            with winreg.OpenKey(winreg.HKEY_LOCAL_MACHINE,
+                                r"SOFTWARE\Microsoft\Windows NT\CurrentVersion") as key:
+                product_name = winreg.QueryValueEx(key, "ProductName")[0]
+                build = int(winreg.QueryValueEx(key, "CurrentBuildNumber")[0])
+        except Exception:
+            return None
+        
+        # Windows 11 still reports "Windows 10" in ProductName
+        if build >= 22000 and product_name.startswith("Windows 10"):
+            product_name = "Windows 11" + product_name[len("Windows 10"):]
+        return f"Microsoft {product_name}"
+
     @staticmethod
     def get_interfaces() -> List[Dict[str, any]]:
+        """List interfaces with a MAC address (cached for INTERFACES_TTL seconds)
+        
+        The returned list is shared between callers and must not be modified.
+        """
+        now = time.monotonic()
+        cached_at = _interfaces_cache['time']
+        if cached_at is not None and now - cached_at < INTERFACES_TTL:
+            return _interfaces_cache['interfaces']
+        
         interfaces = []
         
         # Get network interface information using psutil
@@ -31,6 +153,7 @@ class SystemInfo:
                     'is_up': False,
                     'mac': None,
                     'ipv4': [],
+                    'ipv4_bytes': [],
                     'ipv6': []
                 }
                 
@@ -41,12 +164,13 @@ class SystemInfo:
                         if addr.address:
                             interface_info['mac'] = addr.address.lower().replace('-', ':')
                     elif addr.family == socket.AF_INET:
-                        # IPv4 address
+                        # IPv4 address (also packed, for the management address TLV)
                         interface_info['ipv4'].append(addr.address)
+                        interface_info['ipv4_bytes'].append(socket.inet_aton(addr.address))
                     elif addr.family == socket.AF_INET6:
                         # IPv6 address
                         # Remove scope id from IPv6 address
-                        ipv6_addr = addr.address.split('%')[0]
+                        ipv6_addr = addr.address.partition('%')[0]
                         interface_info['ipv6'].append(ipv6_addr)
                 
                 # Check if interface is up
@@ -60,9 +184,13 @@ class SystemInfo:
             except Exception:
                 continue
         
+        _interfaces_cache['interfaces'] = interfaces
+        _interfaces_cache['by_name'] = {i['name']: i for i in interfaces}
+        _interfaces_cache['time'] = now
         return interfaces
 
     @staticmethod
+    @functools.lru_cache(maxsize=64)
     def get_mac_address_bytes(mac_str: str) -> bytes:
         """Convert MAC address string to bytes"""
         return bytes.fromhex(mac_str.replace(':', '').replace('-', ''))
@@ -70,25 +198,35 @@ class SystemInfo:
     @staticmethod
     def get_primary_ip() -> Optional[str]:
         """Get the primary IP address used for internet connectivity"""
+        now = time.monotonic()
+        cached_at = _primary_ip_cache['time']
+        if cached_at is not None and now - cached_at < INTERFACES_TTL:
+            return _primary_ip_cache['ip']
+        
         try:
-            # Create a dummy connection to determine the primary interface
-            s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-            s.connect(("8.8.8.8", 80))
-            ip = s.getsockname()[0]
-            s.close()
-            return ip
+            ip = _best_route_ip()
         except Exception:
-            return None
+            ip = None
+        if ip is None:
+            try:
+                # Create a dummy connection to determine the primary interface
+                s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+                s.connect(("8.8.8.8", 80))
+                ip = s.getsockname()[0]
+                s.close()
+            except Exception:
+                ip = None
+        
+        _primary_ip_cache['ip'] = ip
+        _primary_ip_cache['time'] = now
+        return ip
 
 
     @staticmethod
     def get_interface_by_name(name: str) -> Optional[Dict[str, any]]:
         """Find interface information by interface name"""
-        interfaces = SystemInfo.get_interfaces()
-        for interface in interfaces:
-            if interface['name'] == name:
-                return interface
-        return None
+        SystemInfo.get_interfaces()
+        return _interfaces_cache['by_name'].get(name)
 
     @staticmethod
     def get_system_capabilities() -> Tuple[int, int]:
@@ -109,37 +247,40 @@ class SystemInfo:
         return capabilities, enabled
 
     @staticmethod
-    def get_interface_index(interface_name: str) -> int:
-        """Get the interface index for a given interface name"""
+    def get_interface_indexes(interfaces: Optional[List[Dict[str, any]]] = None) -> Dict[str, int]:
+        """Map interface names to interface indexes using one adapter enumeration"""
         try:
-            import win32com.client
-            wmi = win32com.client.GetObject("winmgmts:")
-            interfaces = wmi.InstancesOf("Win32_NetworkAdapter")
-            
-            for interface in interfaces:
-                if interface.NetConnectionID == interface_name or interface.Name == interface_name:
-                    return interface.InterfaceIndex or 0
+            indexes = _adapter_indexes()
         except Exception:
-            pass
+            # IP Helper not reachable through ctypes: ask WMI instead
+            indexes = {}
+            try:
+                import win32com.client
+                wmi = win32com.client.GetObject("winmgmts:")
+                adapters = wmi.InstancesOf("Win32_NetworkAdapter")
+                
+                for adapter in adapters:
+                    for name in (adapter.NetConnectionID, adapter.Name):
+                        if name and name not in indexes:
+                            indexes[name] = adapter.InterfaceIndex or 0
+            except Exception:
+                pass
         
         # Fallback: use the order in the interface list
-        interfaces = SystemInfo.get_interfaces()
+        if interfaces is None:
+            interfaces = SystemInfo.get_interfaces()
         for idx, interface in enumerate(interfaces):
-            if interface['name'] == interface_name:
-                return idx + 1
+            indexes.setdefault(interface['name'], idx + 1)
         
-        return 0
+        return indexes
 
 
     @staticmethod
     def ip_to_bytes(ip_str: str) -> bytes:
         """Convert IP address string to bytes"""
         try:
-            # Try IPv4 first
+            if ':' in ip_str:
+                return socket.inet_pton(socket.AF_INET6, ip_str)
             return socket.inet_aton(ip_str)
         except socket.error:
-            try:
-                # Try IPv6
-                return socket.inet_pton(socket.AF_INET6, ip_str)
-            except socket.error:
-                return b''
\ No newline at end of file
+            return b''
\ No newline at end of file
@@ -52,26 +52,15 @@ except ImportError as e:
     sys.exit(1)
 
 try:
-    import scapy
-    import scapy.all
-    import scapy.layers.l2
-    import scapy.layers.inet
-    import scapy.sendrecv
-    import scapy.packet
-    import scapy.fields
-    import scapy.config
-    import scapy.arch.windows
+    import msgpack
 except ImportError as e:
-    print(f"Failed to import scapy: {e}")
+    print(f"Failed to import msgpack: {e}")
     sys.exit(1)
 
-try:
-    # Only import what's actually used by the service functionality
-    import win32serviceutil
-    import servicemanager
-except ImportError as e:
-    # Not fatal as not all commands need Windows service support
-    pass
+# scapy and pywin32 are not imported here: scapy alone takes most of the
+# startup time and only the sender/capture need it, so the modules load
+# them on first use. pyinstaller.spec lists them in hiddenimports so they
+# are still bundled.
 
 # Now import our CLI module
 from winlldp.cli import cli